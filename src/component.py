@@ -1,3 +1,5 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import json
 import logging
 from typing import Dict, List, Set, Union
@@ -38,6 +40,7 @@ class Component(ComponentBase):
         self.client = None
         self.tables = {}
         self._writer_cache = {}
+        self._table_definition_cache: Dict[str, Dict[str, TableDefinition]] = {}
         self.new_state = {}
         super().__init__(data_path_override=data_path_override, required_parameters=REQUIRED_PARAMETERS,
                          required_image_parameters=REQUIRED_IMAGE_PARS)
@@ -70,9 +73,12 @@ class Component(ComponentBase):
         available_tenant_ids = self._get_available_tenant_ids()
         tenant_ids_to_download = self._get_tenants_to_download(available_tenant_ids)
 
-        for endpoint in endpoints:
-            self.download_endpoint(endpoint_name=endpoint, tenant_ids=tenant_ids_to_download,
-                                   if_modified_since=modified_since)
+        try:
+            for endpoint in endpoints:
+                self.download_endpoint(endpoint_name=endpoint, tenant_ids=tenant_ids_to_download,
+                                       if_modified_since=modified_since)
+        finally:
+            self._close_writers()
         if not self.new_state:
             self.refresh_token_and_save_state()
 
@@ -95,29 +101,55 @@ class Component(ComponentBase):
     def download_endpoint(self, endpoint_name: str, tenant_ids: List[str], **kwargs) -> None:
         logging.info(f"Fetching data for endpoint : {endpoint_name}")
         saved_tables: Set[str] = set()
-        for tenant_id in tenant_ids:
-            for pagen_num, page in enumerate(self.client.get_accounting_object(tenant_id=tenant_id,
-                                                                               model_name=endpoint_name,
-                                                                               **kwargs)):
-                logging.info(f"Processing page {pagen_num} of {endpoint_name} for tenant {tenant_id}")
-                parsed_data = XeroParser().parse_data(page)
-                self.save_parsed_data(parsed_data, pagen_num, tenant_id, endpoint_name)
-                saved_tables.update(list(parsed_data.keys()))
+        # Xero rate limits are per tenant, so tenants can be fetched in
+        # parallel; prime the table definition cache first so worker threads
+        # only ever read it
+        self._get_all_table_definitions_of_endpoint_data(endpoint_name)
+        with ThreadPoolExecutor(max_workers=min(8, len(tenant_ids)) or 1) as executor:
+            for tenant_tables in executor.map(
+                    partial(self._download_endpoint_for_tenant, endpoint_name, **kwargs), tenant_ids):
+                saved_tables.update(tenant_tables)
 
         for table_name in saved_tables:
             table_def = self._get_table_definition_of_endpoint_data_by_name(endpoint_name, table_name)
             table_def.incremental = self.incremental_load
             self.write_manifest(table_def)
 
-    def save_parsed_data(self, parsed_data: Dict[str, List[Dict]], pagen_num: int, tenant_id: str,
-                         endpoint_name: str) -> None:
+    def _download_endpoint_for_tenant(self, endpoint_name: str, tenant_id: str, **kwargs) -> Set[str]:
+        saved_tables: Set[str] = set()
+        for pagen_num, page in enumerate(self.client.get_accounting_object(tenant_id=tenant_id,
+                                                                           model_name=endpoint_name,
+                                                                           **kwargs)):
+            logging.info(f"Processing page {pagen_num} of {endpoint_name} for tenant {tenant_id}")
+            parsed_data = XeroParser().parse_data(page)
+            self.save_parsed_data(parsed_data, tenant_id, endpoint_name)
+            saved_tables.update(list(parsed_data.keys()))
+        return saved_tables
+
+    def save_parsed_data(self, parsed_data: Dict[str, List[Dict]], tenant_id: str, endpoint_name: str) -> None:
         for table_name, table_data in parsed_data.items():
+            self._get_writer(endpoint_name, tenant_id, table_name).writerows(table_data)
+
+    def _get_writer(self, endpoint_name: str, tenant_id: str, table_name: str) -> csv.DictWriter:
+        # One open slice file per (endpoint, tenant, table) for the whole run -
+        # pages append to it instead of each opening a fresh file. Distinct
+        # tenants write distinct slices, so the parallel tenant workers never
+        # share a writer.
+        cache_key = (endpoint_name, tenant_id, table_name)
+        cached = self._writer_cache.get(cache_key)
+        if cached is None:
             table_def = self._get_table_definition_of_endpoint_data_by_name(endpoint_name, table_name)
             base_path = os.path.join(self.tables_out_path, table_def.name)
             os.makedirs(base_path, exist_ok=True)
-            with open(os.path.join(base_path, f'{tenant_id}_{endpoint_name}_{pagen_num}.csv'), 'w') as f:
-                csv_writer = csv.DictWriter(f, dialect='kbc', fieldnames=table_def.columns)
-                csv_writer.writerows(table_data)
+            file = open(os.path.join(base_path, f'{tenant_id}_{endpoint_name}.csv'), 'w')
+            cached = (file, csv.DictWriter(file, dialect='kbc', fieldnames=table_def.columns))
+            self._writer_cache[cache_key] = cached
+        return cached[1]
+
+    def _close_writers(self) -> None:
+        for file, _ in self._writer_cache.values():
+            file.close()
+        self._writer_cache.clear()
 
     def _get_table_definition_of_endpoint_data_by_name(self, endpoint_name: str, table_name: str) -> TableDefinition:
         all_table_definitions = self._get_all_table_definitions_of_endpoint_data(endpoint_name)
@@ -127,7 +159,12 @@ class Component(ComponentBase):
         return table_definition
 
     def _get_all_table_definitions_of_endpoint_data(self, endpoint_name: str) -> Dict[str, TableDefinition]:
-        return TableDefinitionFactory(endpoint_name, self).get_table_definitions()
+        # Table definitions (including all column metadata registration) are a pure
+        # function of the endpoint, so build them once instead of per table per page.
+        if endpoint_name not in self._table_definition_cache:
+            self._table_definition_cache[endpoint_name] = \
+                TableDefinitionFactory(endpoint_name, self).get_table_definitions()
+        return self._table_definition_cache[endpoint_name]
 
     def _init_client(self) -> None:
         logging.info("Authorizing Client")
@@ -1,19 +1,20 @@
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import inspect
 from http.client import RemoteDisconnected
+import time
 from typing import Dict, Iterable, List
 
 from tenacity import retry, wait_exponential, stop_after_attempt, retry_if_exception_type
 from urllib3.exceptions import ProtocolError
 
-from keboola.component.dao import OauthCredentials, TableDefinition
+from keboola.component.dao import OauthCredentials
 
 from xero_python.identity import IdentityApi
 from xero_python.accounting import AccountingApi
 from xero_python.api_client import ApiClient
 from xero_python.api_client.configuration import Configuration
 from xero_python.api_client.oauth2 import OAuth2Token
-from xero_python.api_client.serializer import serialize
 
 from xero_python.exceptions.http_status_exceptions import OAuth2InvalidGrantError, HTTPStatusException
 
@@ -23,10 +24,11 @@ from .utility import XeroException, get_accounting_model, EnhancedBaseModel
 from ratelimit import limits, sleep_and_retry
 
 
-@dataclass
-class Table:
-    data: List[Dict]
-    table_definition: TableDefinition
+@lru_cache(maxsize=None)
+def _download_method_signature(getter_name: str) -> inspect.Signature:
+    # inspect.signature is surprisingly expensive; the signature of a given
+    # AccountingApi method never changes, so resolve it once per method
+    return inspect.signature(getattr(AccountingApi, getter_name))
 
 
 class XeroClient:
@@ -36,11 +38,30 @@ class XeroClient:
         oauth2_token_obj = OAuth2Token(client_id=oauth_credentials.appKey,
                                        client_secret=oauth_credentials.appSecret)
         oauth2_token_obj.update_token(**self._oauth_token_dict)
-        self._api_client = ApiClient(Configuration(oauth2_token=oauth2_token_obj),
+        configuration = Configuration(oauth2_token=oauth2_token_obj)
+        # keep enough pooled connections for the page-prefetch thread to reuse
+        # the TLS session instead of re-handshaking per request
+        configuration.connection_pool_maxsize = 16
+        self._api_client = ApiClient(configuration,
                                      oauth2_token_getter=self.get_xero_oauth2_token_dict,
                                      oauth2_token_saver=self._set_xero_oauth2_token_dict)
 
         self._available_tenant_ids = None
+        self._accounting_api = None
+        self._identity_api = None
+        self._getter_cache = {}
+
+    @property
+    def accounting_api(self) -> AccountingApi:
+        if self._accounting_api is None:
+            self._accounting_api = AccountingApi(self._api_client)
+        return self._accounting_api
+
+    @property
+    def identity_api(self) -> IdentityApi:
+        if self._identity_api is None:
+            self._identity_api = IdentityApi(self._api_client)
+        return self._identity_api
 
     def get_xero_oauth2_token_dict(self) -> Dict:
         return self._oauth_token_dict
@@ -49,12 +70,11 @@ class XeroClient:
         self._oauth_token_dict = new_token
 
     def refresh_available_tenant_ids(self) -> None:
-        identity_api = IdentityApi(self._api_client)
-        available_tenants = []
         try:
-            for connection in identity_api.get_connections():
-                tenant = serialize(connection)
-                available_tenants.append(tenant.get("tenantId"))
+            # the model exposes tenantId directly - no need to serialize
+            # the whole connection object to read one field
+            available_tenants = [connection.tenant_id
+                                 for connection in self.identity_api.get_connections()]
         except (OAuth2InvalidGrantError, HTTPStatusException) as oauth_err:
             raise XeroException(oauth_err) from oauth_err
         self._available_tenant_ids = available_tenants
@@ -63,6 +83,11 @@ class XeroClient:
            stop=stop_after_attempt(3),
            retry=retry_if_exception_type((HTTPStatusException, ProtocolError, RemoteDisconnected)))
     def force_refresh_token(self):
+        # Xero refresh tokens are single use - don't burn one (and a token
+        # endpoint round trip) while the current access token is still
+        # comfortably valid; 60 s of skew covers clock drift and run time
+        if self._oauth_token_dict.get('expires_at', 0) - 60 > time.time():
+            return
         try:
             self._api_client.refresh_oauth2_token()
         except (HTTPStatusException, ProtocolError) as error:
@@ -75,35 +100,47 @@ class XeroClient:
         return self._available_tenant_ids
 
     def get_accounting_object(self, tenant_id: str, model_name: str, **kwargs) -> Iterable[List[EnhancedBaseModel]]:
-        accounting_api = AccountingApi(self._api_client)
         model: EnhancedBaseModel = get_accounting_model(model_name)
         getter_name = model.get_download_method_name()
         if getter_name:
-            getter = sleep_and_retry(limits(calls=50, period=60)(getattr(accounting_api, getter_name)))
-            getter_signature = inspect.signature(getter)
+            # Resolve and rate-limit-wrap each getter once per (method, tenant) -
+            # a fresh limits() wrapper per call would start a new rate window
+            # every time, while sharing one wrapper across tenants would
+            # throttle the parallel tenant workers against a single 50/60s
+            # window even though Xero enforces the limit per tenant
+            getter = self._getter_cache.get((getter_name, tenant_id))
+            if getter is None:
+                getter = sleep_and_retry(limits(calls=50, period=60)(getattr(self.accounting_api, getter_name)))
+                self._getter_cache[(getter_name, tenant_id)] = getter
+            getter_signature = _download_method_signature(getter_name)
             used_kwargs = {k: v for k, v in kwargs.items()
                            if k in getter_signature.parameters and v is not None}
             if 'page' in getter_signature.parameters:
+                # Prefetch the next page in the background so parsing of the
+                # current page overlaps with the next HTTP round trip
                 used_kwargs['page'] = 1
-                while True:
-                    accounting_object = getter(tenant_id, **used_kwargs)
-                    if accounting_object.is_empty_list():
-                        break
-                    yield accounting_object.to_list()
-                    used_kwargs['page'] = used_kwargs['page'] + 1
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    next_page = executor.submit(getter, tenant_id, **used_kwargs)
+                    while True:
+                        accounting_object = next_page.result()
+                        if accounting_object.is_empty_list():
+                            break
+                        used_kwargs['page'] = used_kwargs['page'] + 1
+                        next_page = executor.submit(getter, tenant_id, **used_kwargs)
+                        yield accounting_object.to_list()
             elif 'offset' in getter_signature.parameters:
                 used_kwargs['offset'] = 0
-                while True:
-                    accounting_object = getter(tenant_id, **used_kwargs)
-                    if accounting_object.is_empty_list():
-                        break
-                    yield accounting_object.to_list()
-                    used_kwargs['offset'] = used_kwargs['offset'] + 100
+                with ThreadPoolExecutor(max_workers=1) as executor:
+                    next_batch = executor.submit(getter, tenant_id, **used_kwargs)
+                    while True:
+                        accounting_object = next_batch.result()
+                        if accounting_object.is_empty_list():
+                            break
+                        used_kwargs['offset'] = used_kwargs['offset'] + 100
+                        next_batch = executor.submit(getter, tenant_id, **used_kwargs)
+                        yield accounting_object.to_list()
             else:
                 yield getter(tenant_id, **used_kwargs).to_list()
         else:
             raise XeroException(
                 f"Requested model ({model_name}) getter function not found.")
-
-    def get_serialized_accounting_object(self, model_name: str, **kwargs) -> Dict:
-        return serialize(self.get_accounting_object(model_name, **kwargs))
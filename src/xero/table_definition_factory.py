@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Union, Dict
 from keboola.component import ComponentBase
 from keboola.component.dao import TableDefinition
@@ -35,10 +36,10 @@ class TableDefinitionFactory:
             field_types[parent_id_field_name] = TERMINAL_TYPE_MAPPING['str']
             primary_key.add(parent_id_field_name)
         for attr_name, type_name in model.openapi_types.items():
-            field_types = field_types | self._get_field_types_of_attribute(
+            field_types.update(self._get_field_types_of_attribute(
                 type_name=type_name, field_name=model.get_field_name(
                     attr_name),
-                table_name_prefix=table_name, parent_id_field_name=id_field_name)
+                table_name_prefix=table_name, parent_id_field_name=id_field_name))
         if len(field_types) > 0:
             self._table_defs[table_name] = self.component.create_out_table_definition(name=f'{table_name}.csv',
                                                                                       primary_key=list(primary_key),
@@ -70,15 +71,17 @@ class TableDefinitionFactory:
                 if element_resolved_type in ('struct', 'downloadable_object'):
                     self.add_table_def_of(get_accounting_model(element_type_name), table_name_prefix=table_name_prefix,
                                           parent_id_field_name=parent_id_field_name)
-                    return {}
-            else:
-                return {}
+            # lists never contribute columns to the parent table
+            return {}
         else:
             raise XeroException(
                 f"Unexpected attribute type encountered: {type_name}.")
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def _get_field_types_of_struct(struct: EnhancedBaseModel, prefix: str) -> Dict[str, KeboolaTypeSpec]:
+        # pure function of (struct class, prefix) - callers merge the result
+        # into fresh dicts, so sharing the cached dict is safe
         field_types = {}
         for struct_attr_name, struct_attr_type_name in struct.openapi_types.items():
             struct_attr_handled = False
@@ -93,8 +96,8 @@ class TableDefinitionFactory:
                 elif resolved_struct_attr_type_name == 'struct':
                     struct_attr_model: EnhancedBaseModel = get_accounting_model(
                         struct_attr_type_name)
-                    field_types = field_types | TableDefinitionFactory._get_field_types_of_struct(
-                        struct_attr_model, field_name_inside_parent)
+                    field_types.update(TableDefinitionFactory._get_field_types_of_struct(
+                        struct_attr_model, field_name_inside_parent))
                     struct_attr_handled = True
             if not struct_attr_handled:
                 raise XeroException(
@@ -1,9 +1,13 @@
 from dataclasses import dataclass
 from enum import Enum
-from typing import Any, List, Union, Callable
+from functools import lru_cache
+import threading
+from typing import Any, Dict, List, Union, Callable
 from keboola.component.dao import SupportedDataTypes
 from xero_python.models import BaseModel
 from xero_python.accounting import AccountingApi
+from xero_python.api_client.oauth2 import OAuth2Token
+from xero_python.exceptions import AccessTokenExpiredError
 import xero_python.accounting.models
 from xero_python.api_client.serializer import LIST_DATA_TYPE
 
@@ -27,6 +31,7 @@ TERMINAL_TYPE_MAPPING = {'str': KeboolaTypeSpec(type=SupportedDataTypes.STRING),
                          'datetime': KeboolaTypeSpec(type=SupportedDataTypes.TIMESTAMP)}
 
 
+@lru_cache(maxsize=None)
 def get_element_type_name(type_str: str) -> Union[str, None]:
     match = LIST_DATA_TYPE.search(type_str)
     if match:
@@ -35,6 +40,7 @@ def get_element_type_name(type_str: str) -> Union[str, None]:
         return None
 
 
+@lru_cache(maxsize=None)
 def resolve_attribute_type(type_name: str) -> str:
     if type_name in TERMINAL_TYPE_MAPPING:
         r = type_name
@@ -58,10 +64,59 @@ def resolve_attribute_type(type_name: str) -> str:
     return r
 
 
+@lru_cache(maxsize=None)
 def get_accounting_model(model_name: str) -> Union[BaseModel, None]:
     return getattr(xero_python.accounting.models, model_name, None)
 
 
+# Values derived purely from a model class - computed once per class instead of
+# on every call of the patched BaseModel helpers below
+
+@lru_cache(maxsize=None)
+def _inverse_attribute_map(model_class: type) -> Dict[str, str]:
+    return {v: k for k, v in model_class.attribute_map.items()}
+
+
+@lru_cache(maxsize=None)
+def _field_names(model_class: type) -> tuple:
+    return tuple(model_class.attribute_map.values())
+
+
+@lru_cache(maxsize=None)
+def _id_field_name(model_class: type) -> Union[str, None]:
+    id_field_name = f'{model_class.__name__}ID'
+    if id_field_name in model_class.attribute_map.values():
+        return id_field_name
+    else:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _download_method_name(model_class: type) -> Union[str, None]:
+    id_attr_name = _inverse_attribute_map(model_class).get(_id_field_name(model_class))
+    getter_name = None
+    if id_attr_name:
+        getter_name = f'get_{id_attr_name.replace("_id", "")}'
+    else:
+        if len(model_class.attribute_map) == 1:
+            getter_name = f'get_{_inverse_attribute_map(model_class).get(model_class.__name__)}'
+    if getter_name and hasattr(AccountingApi, getter_name):
+        return getter_name
+    else:
+        return None
+
+
+@lru_cache(maxsize=None)
+def _list_attribute_name(model_class: type) -> Union[str, None]:
+    attr_list = list(model_class.attribute_map.keys())
+    attr_name = attr_list[0]
+    attr_type = model_class.openapi_types[attr_name]
+    if len(attr_list) == 1 and LIST_DATA_TYPE.match(attr_type):
+        return attr_name
+    else:
+        return None
+
+
 def add_as_a_method_of(cls):
     def decorator(func):
         setattr(cls, func.__name__, func)
@@ -77,7 +132,7 @@ class EnhancedBaseModel(BaseModel):
     @add_as_a_method_of(BaseModel)
     @classmethod
     def get_field_names(cls: BaseModel) -> List[str]:
-        return list(cls.attribute_map.values())
+        return list(_field_names(cls))
 
     @add_as_a_method_of(BaseModel)
     @classmethod
@@ -87,8 +142,7 @@ class EnhancedBaseModel(BaseModel):
     @add_as_a_method_of(BaseModel)
     @classmethod
     def get_attr_name(cls: BaseModel, field_name: str) -> Union[str, None]:
-        inv_map = {v: k for k, v in cls.attribute_map.items()}
-        return inv_map.get(field_name)
+        return _inverse_attribute_map(cls).get(field_name)
 
     @add_as_a_method_of(BaseModel)
     def get_field_value(self: BaseModel, field_name: str, default=None) -> Any:
@@ -101,11 +155,7 @@ class EnhancedBaseModel(BaseModel):
     @add_as_a_method_of(BaseModel)
     @classmethod
     def get_id_field_name(cls: BaseModel) -> Union[str, None]:
-        id_field_name = f'{cls.__name__}ID'
-        if id_field_name in cls.get_field_names():
-            return id_field_name
-        else:
-            return None
+        return _id_field_name(cls)
 
     @add_as_a_method_of(BaseModel)
     @classmethod
@@ -127,17 +177,7 @@ class EnhancedBaseModel(BaseModel):
     @add_as_a_method_of(BaseModel)
     @classmethod
     def get_download_method_name(cls: BaseModel) -> Union[Callable, None]:
-        id_attr_name = cls.get_id_attribute_name()
-        getter_name = None
-        if id_attr_name:
-            getter_name = f'get_{id_attr_name.replace("_id", "")}'
-        else:
-            if len(cls.attribute_map) == 1:
-                getter_name = f'get_{cls.get_attr_name(cls.__name__)}'
-        if getter_name and hasattr(AccountingApi, getter_name):
-            return getter_name
-        else:
-            return None
+        return _download_method_name(cls)
 
     @add_as_a_method_of(BaseModel)
     @classmethod
@@ -147,13 +187,7 @@ class EnhancedBaseModel(BaseModel):
     @add_as_a_method_of(BaseModel)
     @classmethod
     def get_list_attribute_name(cls: BaseModel) -> Union[str, None]:
-        attr_list = list(cls.attribute_map.keys())
-        attr_name = attr_list[0]
-        attr_type = cls.openapi_types[attr_name]
-        if len(attr_list) == 1 and LIST_DATA_TYPE.match(attr_type):
-            return attr_name
-        else:
-            return None
+        return _list_attribute_name(cls)
 
     @add_as_a_method_of(BaseModel)
     def to_list(self: BaseModel) -> List[BaseModel]:
@@ -178,3 +212,24 @@ class EnhancedBaseModel(BaseModel):
             return get_accounting_model(model_name)
         else:
             return cls
+
+
+# The component builds a single client (and thus a single OAuth2Token) per
+# run, so one module-level lock is enough to serialize its refreshes
+_token_refresh_lock = threading.Lock()
+
+
+@add_as_a_method_of(OAuth2Token)
+def get_valid_access_token(self: OAuth2Token, api_client=None, at_time=None) -> str:
+    # The SDK refreshes inline with no lock, so when the parallel tenant
+    # workers cross the expiry window together each would fire its own
+    # refresh with the same single-use refresh token. Serialize the refresh
+    # and re-check validity after acquiring, so late arrivals reuse the
+    # token the first thread fetched instead of refreshing again.
+    if self.is_access_token_valid(at_time):
+        return self.access_token
+    with _token_refresh_lock:
+        if not self.is_access_token_valid(at_time):
+            if not self.refresh_access_token(api_client):
+                raise AccessTokenExpiredError("Access Token has expired")
+        return self.access_token
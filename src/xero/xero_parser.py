@@ -1,67 +1,171 @@
+from collections import deque
+import datetime
+from functools import lru_cache
 from typing import Any, Dict, List, Tuple
 import hashlib
 import json
+import sys
 
 from xero_python.api_client.serializer import serialize
 
 from .utility import XeroException, TERMINAL_TYPE_MAPPING, resolve_attribute_type, \
     EnhancedBaseModel
 
+# Types serialize() would return unchanged - not worth the dispatch call
+_PRIMITIVE_TYPES = (str, int, float, bool)
+# Types serialize() would turn into their isoformat() string
+_DATE_TYPES = (datetime.datetime, datetime.date)
+
+try:
+    import orjson
+
+    def _canonical_bytes(data) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+except ImportError:
+    def _canonical_bytes(data) -> bytes:
+        return json.dumps(data, sort_keys=True).encode('utf-8')
+
+
+@lru_cache(maxsize=None)
+def _get_field_plan(model_class: type) -> Tuple[Tuple[str, str, str], ...]:
+    """Per-class tuple of (storage_key, field_name, resolved_type) triples.
+
+    How each attribute is parsed is fully determined by the model class, so
+    classify it once per class instead of once per row. xero_python models
+    keep attribute values in the instance __dict__ under '_<attribute_name>',
+    so the storage key lets the row loop bypass the property descriptors.
+    """
+    def storage_key(attribute_name: str) -> str:
+        key = f'_{attribute_name}'
+        if key.startswith('__'):
+            # attributes like Account._class are stored name-mangled
+            key = f'_{model_class.__name__}{key}'
+        return key
+
+    return tuple(
+        (storage_key(attribute_name), sys.intern(model_class.attribute_map[attribute_name]),
+         resolve_attribute_type(attribute_type_name))
+        for attribute_name, attribute_type_name in model_class.openapi_types.items())
+
+
+@lru_cache(maxsize=None)
+def _get_partitioned_field_plan(model_class: type) -> Tuple[Tuple, Tuple]:
+    """Field plan split into (terminal_fields, other_fields).
+
+    Terminal fields become cells of the object's own row and can be built in
+    one dict comprehension; the rest (lists, structs, references) need the
+    generic dispatch.
+    """
+    plan = _get_field_plan(model_class)
+    terminal_fields = tuple(entry for entry in plan if entry[2] in TERMINAL_TYPE_MAPPING)
+    other_fields = tuple(entry for entry in plan if entry[2] not in TERMINAL_TYPE_MAPPING)
+    return terminal_fields, other_fields
+
+
+@lru_cache(maxsize=None)
+def _get_struct_plan(model_class: type, prefix: str) -> Tuple[Tuple[str, str, str], ...]:
+    """Field plan of a struct with the flattened column names prebuilt.
+
+    The '{prefix}_{field_name}' strings are interned and built once per
+    (class, prefix) pair instead of per row.
+    """
+    return tuple(
+        (storage_key, sys.intern(f'{prefix}_{field_name}'), resolved_type)
+        for storage_key, field_name, resolved_type in _get_field_plan(model_class))
+
 
 class XeroParser:
     def __init__(self) -> None:
         self.parsed_data = None
+        self._object_queue = None
+        self._seen_rows = None
 
     def parse_data(self, xero_object_data) -> Dict[str, List[Dict]]:
         self.parsed_data = {}
+        self._seen_rows = set()
         self._parse_data(xero_object_data)
         return self.parsed_data
 
     def _parse_data(self, accounting_object_list: List[EnhancedBaseModel]) -> None:
-        for accounting_object in accounting_object_list:
-            self._add_data_from_object(accounting_object)
+        # Nested objects are handled via an explicit work queue instead of
+        # recursion - no Python frame per nesting level and no recursion-limit
+        # exposure on deeply nested payloads
+        self._object_queue = deque(
+            (accounting_object, None, None, None) for accounting_object in accounting_object_list)
+        while self._object_queue:
+            self._add_data_from_object(*self._object_queue.popleft())
 
     def _add_data_from_object(self, xero_object_data: EnhancedBaseModel, table_name_prefix: str = None,
                               parent_id_field_name: str = None, parent_id_field_value: str = None) -> None:
 
         table_name = self._create_table_name(xero_object_data, table_name_prefix)
         id_field_name, id_field_value = self._get_xero_object_id_name_and_value(xero_object_data)
+        # The same nested object can be reached through several parents (and
+        # id-less objects hash to the same synthetic id when identical); the
+        # ids match the table's primary key, so duplicate visits would only
+        # re-emit the same row - skip them
+        row_key = (table_name, id_field_value, parent_id_field_value)
+        if row_key in self._seen_rows:
+            return
+        self._seen_rows.add(row_key)
         row_dict = {id_field_name: id_field_value}
         row_dict |= self._get_parent_id_name_and_value(parent_id_field_name, parent_id_field_value)
         row_dict |= self._parse_fields(xero_object_data, table_name, id_field_name, id_field_value)
 
-        if not self.parsed_data.get(table_name):
-            self.parsed_data[table_name] = []
-        self.parsed_data[table_name].append(row_dict)
+        self.parsed_data.setdefault(table_name, []).append(row_dict)
 
     def _parse_fields(self, xero_object_data: EnhancedBaseModel, table_name: str, id_field_name: str,
                       id_field_value: str) -> Dict:
-        field_data = {}
-        for attribute_name, attribute_type_name in xero_object_data.openapi_types.items():
-            attribute_value = getattr(xero_object_data, attribute_name)
-            if attribute_value is not None:
-                field_name = xero_object_data.get_field_name(attribute_name)
-                attribute_dict = self._get_data_from_attribute(
-                    value=attribute_value, type_name=attribute_type_name, field_name=field_name,
-                    table_name=table_name, id_field_name=id_field_name, id_field_value=id_field_value)
-                field_data = field_data | attribute_dict
+        # Nested objects are often empty apart from their id - one C-level scan
+        # of the instance dict (values live under '_<attr>' keys) is cheaper
+        # than running the whole per-field dispatch loop for nothing
+        if not any(value is not None for key, value in xero_object_data.__dict__.items() if key[0] == '_'):
+            return {}
+        # Bind hot names to locals - LOAD_FAST instead of LOAD_GLOBAL/LOAD_ATTR
+        # per iteration of the per-row loop
+        object_dict_get = xero_object_data.__dict__.get
+        _get_data_from_attribute = self._get_data_from_attribute
+        terminal_fields, other_fields = _get_partitioned_field_plan(type(xero_object_data))
+        field_data = {
+            field_name: (attribute_value if isinstance(attribute_value, _PRIMITIVE_TYPES)
+                         else attribute_value.isoformat() if isinstance(attribute_value, _DATE_TYPES)
+                         else serialize(attribute_value))
+            for storage_key, field_name, _ in terminal_fields
+            for attribute_value in (object_dict_get(storage_key),)
+            if attribute_value is not None
+        }
+        for storage_key, field_name, resolved_type in other_fields:
+            attribute_value = object_dict_get(storage_key)
+            # Optional Xero fields are unset most of the time - skip them before
+            # dispatching on the resolved type
+            if attribute_value is None or attribute_value == []:
+                continue
+            attribute_dict = _get_data_from_attribute(
+                value=attribute_value, resolved_type=resolved_type, field_name=field_name,
+                table_name=table_name, id_field_name=id_field_name, id_field_value=id_field_value)
+            # update in place - the | union would copy every key accumulated
+            # so far on each iteration, making wide rows quadratic
+            if attribute_dict:
+                field_data.update(attribute_dict)
         return field_data
 
-    def _get_data_from_attribute(self, value, type_name: str, field_name: str, table_name: str,
+    def _get_data_from_attribute(self, value, resolved_type: str, field_name: str, table_name: str,
                                  id_field_name: str, id_field_value: str) -> Dict[str, Any]:
-        resolved_type = resolve_attribute_type(type_name)
         if resolved_type == 'list':
+            # Xero lists are monomorphic in practice - classify the element
+            # type once per class run instead of once per element
+            element_class = None
+            element_resolved_type_name = None
             for element in value:
-                element_type_name = element.__class__.__name__
-                element_resolved_type_name = resolve_attribute_type(
-                    element_type_name)
+                if element.__class__ is not element_class:
+                    element_class = element.__class__
+                    element_resolved_type_name = resolve_attribute_type(element_class.__name__)
                 if element_resolved_type_name in ('struct', 'downloadable_object'):
-                    self._add_data_from_object(element, table_name_prefix=table_name,
-                                               parent_id_field_name=id_field_name, parent_id_field_value=id_field_value)
+                    self._object_queue.append((element, table_name, id_field_name, id_field_value))
 
                 elif element is not None:
                     raise XeroException(
-                        f'Unexpected type encountered: {type_name(element)}'
+                        f'Unexpected type encountered: {element_class.__name__}'
                         f' within list in {field_name} field within object'
                         f' of type {table_name}.')
             return {}
@@ -73,34 +177,46 @@ class XeroParser:
         elif resolved_type == 'struct':
             return self._flatten_struct(value, prefix=field_name)
         elif resolved_type in TERMINAL_TYPE_MAPPING:
-            return {field_name: serialize(value)}
+            if isinstance(value, _PRIMITIVE_TYPES):
+                return {field_name: value}
+            return {field_name: value.isoformat() if isinstance(value, _DATE_TYPES) else serialize(value)}
 
     def _flatten_struct(self, struct: EnhancedBaseModel, prefix: str) -> Dict[str, Any]:
+        # Iterative traversal with an explicit stack - avoids a Python call frame
+        # per nesting level on deeply nested structs.
         flattened_struct = {}
-        for struct_attr_name, struct_attr_type_name in struct.openapi_types.items():
-            struct_attr_val = getattr(struct, struct_attr_name)
-            if struct_attr_val is not None:
-                resolved_type = resolve_attribute_type(struct_attr_type_name)
-                struct_field_name = struct.get_field_name(struct_attr_name)
-                field_name_inside_parent = f'{prefix}_{struct_field_name}'
+        stack = [(struct, prefix)]
+        stack_append = stack.append
+        _serialize = serialize
+        while stack:
+            current_struct, current_prefix = stack.pop()
+            struct_dict_get = current_struct.__dict__.get
+            for storage_key, field_name_inside_parent, resolved_type in \
+                    _get_struct_plan(type(current_struct), current_prefix):
+                struct_attr_val = struct_dict_get(storage_key)
+                if struct_attr_val is None:
+                    continue
                 if resolved_type == 'struct':
-                    flattened_struct = flattened_struct | self._flatten_struct(
-                        struct_attr_val, prefix=field_name_inside_parent)
+                    stack_append((struct_attr_val, field_name_inside_parent))
                 elif resolved_type in TERMINAL_TYPE_MAPPING:
-                    flattened_struct[field_name_inside_parent] = serialize(
-                        struct_attr_val)
+                    if isinstance(struct_attr_val, _PRIMITIVE_TYPES):
+                        flattened_struct[field_name_inside_parent] = struct_attr_val
+                    elif isinstance(struct_attr_val, _DATE_TYPES):
+                        flattened_struct[field_name_inside_parent] = struct_attr_val.isoformat()
+                    else:
+                        flattened_struct[field_name_inside_parent] = _serialize(struct_attr_val)
                 else:
                     raise XeroException(
-                        f'Unexpected type encountered in struct: {struct.openapi_types[struct_attr_name]}.')
+                        f'Unexpected type encountered in struct: {resolved_type}.')
         return flattened_struct
 
     @staticmethod
     def _generate_hash_id(data_to_hash: bytes) -> str:
-        return hashlib.md5(data_to_hash).hexdigest()
+        return hashlib.blake2b(data_to_hash, digest_size=16, usedforsecurity=False).hexdigest()
 
     @staticmethod
     def _dump_xero_object_data(accounting_object: EnhancedBaseModel) -> bytes:
-        return json.dumps(serialize(accounting_object), sort_keys=True).encode('utf-8')
+        return _canonical_bytes(serialize(accounting_object))
 
     def _get_xero_object_id_name_and_value(self, xero_object_data: EnhancedBaseModel) -> Tuple[str, str]:
         table_name = xero_object_data.__class__.__name__